@@ -0,0 +1,170 @@
+from sqlmodel import Session, select, delete, insert, update, func
+from sqlalchemy import Engine, text
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from sqlalchemy.orm import joinedload
+from models.refeicao import Refeicao, RefeicaoAlimento
+from models.arquivo import RefeicaoArquivada, RefeicaoAlimentoArquivada, EstadoArquivamento
+from models.contador import ContadorAlimentosRefeicao
+import os
+
+load_dotenv()
+
+# Quantidade de dias de historico que fica nas tabelas ativas
+HORIZONTE_DIAS = int(os.getenv("ARQUIVO_HORIZONTE_DIAS", "365"))
+
+# Quantidade de ids por comando, abaixo do limite de parametros do sqlite
+TAMANHO_LOTE = 500
+
+
+def migrar_ids_refeicao(engine: Engine) -> None:
+    """
+    Garante que o sqlite nunca reutilize ids de refeicoes, ja que as arquivadas mantem o id original.
+    Bancos criados antes do arquivamento tem a tabela refeicao sem AUTOINCREMENT e o
+    create_all nao altera tabelas existentes, entao ela e recriada aqui uma unica vez
+
+    Args:
+        engine (Engine): Engine do banco de dados
+    """
+    if engine.dialect.name != "sqlite":
+        return  # No postgres o id vem de uma sequence, que nunca volta
+
+    with engine.connect() as conn:
+        ddl = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'refeicao'").scalar()
+        conn.commit()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            return
+
+        # foreign_keys so pode ser alterado fora de transacao e legacy_alter_table evita
+        # que o rename reescreva as foreign keys de refeicaoalimento para a tabela antiga
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.exec_driver_sql("PRAGMA legacy_alter_table=ON")
+        try:
+            conn.exec_driver_sql("BEGIN")
+            conn.exec_driver_sql("ALTER TABLE refeicao RENAME TO refeicao_antiga")
+            indices = conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'refeicao_antiga' AND sql IS NOT NULL"
+            ).scalars().all()
+            for indice in indices:
+                conn.exec_driver_sql(f'DROP INDEX "{indice}"')
+            Refeicao.__table__.create(conn)
+            conn.exec_driver_sql(
+                "INSERT INTO refeicao (id, tipo, data, usuario_id) SELECT id, tipo, data, usuario_id FROM refeicao_antiga"
+            )
+            conn.exec_driver_sql("DROP TABLE refeicao_antiga")
+
+            # Ids que so existem no arquivo tambem nao podem voltar a ser usados
+            maior_id = conn.execute(select(func.max(RefeicaoArquivada.id))).scalar() or 0
+            conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'refeicao'"))
+            conn.execute(
+                text("INSERT INTO sqlite_sequence (name, seq) SELECT 'refeicao', MAX(COALESCE(MAX(id), 0), :maior_id) FROM refeicao"),
+                {"maior_id": maior_id},
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            conn.commit()
+
+
+def get_data_corte(session: Session) -> date | None:
+    """
+    Retorna a data ate onde as refeicoes ja foram arquivadas.
+    Refeicoes com data anterior a ela podem estar no arquivo, as demais ficam nas tabelas ativas
+    """
+    estado = session.get(EstadoArquivamento, 1)
+    return estado.data_corte if estado else None
+
+
+def particoes_por_periodo(session: Session, inicio: date | None = None) -> list:
+    """
+    Retorna os modelos (tabelas) que precisam ser consultados a partir de uma data
+
+    Args:
+        session (Session): Sessao do banco de dados
+        inicio (date): Data inicial do periodo consultado, None para todo o historico
+
+    Returns:
+        list: Lista com Refeicao e/ou RefeicaoArquivada
+    """
+    data_corte = get_data_corte(session)
+    if data_corte is None or (inicio is not None and inicio >= data_corte):
+        return [Refeicao]
+    # Refeicoes criadas com data antiga depois do ultimo arquivamento continuam
+    # na tabela ativa ate a proxima execucao, por isso ela tambem e consultada
+    return [RefeicaoArquivada, Refeicao]
+
+
+def buscar_refeicao(session: Session, refeicao_id: int, carregar: str | None = None) -> Refeicao | RefeicaoArquivada | None:
+    """
+    Procura uma refeicao pelo id na tabela ativa e, se nao encontrar, no arquivo
+
+    Args:
+        session (Session): Sessao do banco de dados
+        refeicao_id (int): Id da refeicao
+        carregar (str): Nome do relacionamento carregado junto (joinedload), ex: "alimentos"
+
+    Returns:
+        Refeicao | RefeicaoArquivada | None: A refeicao encontrada ou None
+    """
+    for modelo in (Refeicao, RefeicaoArquivada):
+        statement = select(modelo).where(modelo.id == refeicao_id)
+        if carregar:
+            statement = statement.options(joinedload(getattr(modelo, carregar)))
+        refeicao = session.exec(statement).unique().one_or_none()
+        if refeicao:
+            return refeicao
+    return None
+
+
+def arquivar_refeicoes(session: Session, horizonte_dias: int = HORIZONTE_DIAS) -> int:
+    """
+    Move as refeicoes mais antigas que o horizonte para as tabelas de arquivo
+
+    Args:
+        session (Session): Sessao do banco de dados
+        horizonte_dias (int): Quantidade de dias que permanecem nas tabelas ativas
+
+    Returns:
+        int: Quantidade de refeicoes arquivadas
+    """
+    data_corte = date.today() - timedelta(days=horizonte_dias)
+
+    # Os ids sao escolhidos uma unica vez (e travados no postgres) para que uma refeicao
+    # criada durante o arquivamento nao seja apagada sem ter sido copiada
+    ids = session.exec(
+        select(Refeicao.id).where(Refeicao.data < data_corte).with_for_update()
+    ).all()
+
+    total = 0
+    for inicio in range(0, len(ids), TAMANHO_LOTE):
+        lote = ids[inicio:inicio + TAMANHO_LOTE]
+        session.exec(insert(RefeicaoArquivada).from_select(
+            ["id", "tipo", "data", "usuario_id"],
+            select(Refeicao.id, Refeicao.tipo, Refeicao.data, Refeicao.usuario_id).where(Refeicao.id.in_(lote)),
+        ))
+        session.exec(insert(RefeicaoAlimentoArquivada).from_select(
+            ["refeicao_id", "alimento_id"],
+            select(RefeicaoAlimento.refeicao_id, RefeicaoAlimento.alimento_id).where(RefeicaoAlimento.refeicao_id.in_(lote)),
+        ))
+        session.exec(
+            update(ContadorAlimentosRefeicao)
+            .where(ContadorAlimentosRefeicao.refeicao_id.in_(lote), ContadorAlimentosRefeicao.arquivada == False)
+            .values(arquivada=True)
+        )
+        session.exec(delete(RefeicaoAlimento).where(RefeicaoAlimento.refeicao_id.in_(lote)))
+        total += session.exec(delete(Refeicao).where(Refeicao.id.in_(lote))).rowcount
+
+    # A data de corte nunca volta, mesmo que o horizonte aumente, pois o arquivo
+    # ainda guarda as refeicoes movidas antes
+    estado = session.get(EstadoArquivamento, 1)
+    if not estado:
+        estado = EstadoArquivamento(id=1, data_corte=data_corte)
+    estado.data_corte = max(estado.data_corte, data_corte)
+    session.add(estado)
+    session.commit()
+
+    return total
@@ -0,0 +1,92 @@
+from sqlmodel import Session, select, func, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from models.contador import ContadorRefeicoesUsuario, ContadorAlimentosRefeicao
+from models.refeicao import Refeicao, RefeicaoAlimento
+from models.arquivo import RefeicaoArquivada, RefeicaoAlimentoArquivada
+
+
+def total_refeicoes_usuario(session: Session, usuario_id: int) -> int:
+    contador = session.get(ContadorRefeicoesUsuario, usuario_id)
+    return contador.total if contador else 0
+
+
+def total_alimentos_refeicao(session: Session, refeicao_id: int, arquivada: bool = False) -> int:
+    contador = session.get(ContadorAlimentosRefeicao, (refeicao_id, arquivada))
+    return contador.total if contador else 0
+
+
+def _insert_ou_atualizar(session: Session, modelo, chaves: dict, total: int, somar: bool) -> None:
+    """
+    Grava o contador com um unico INSERT ... ON CONFLICT DO UPDATE, assim a soma e feita
+    pelo banco e duas requisicoes ao mesmo tempo nao perdem incrementos
+    """
+    dialeto = session.get_bind().dialect.name
+    insert = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+    statement = insert(modelo).values(**chaves, total=total)
+    novo_total = modelo.total + statement.excluded.total if somar else statement.excluded.total
+    statement = statement.on_conflict_do_update(index_elements=list(chaves), set_={"total": novo_total})
+    session.exec(statement)
+
+
+def somar_refeicoes_usuario(session: Session, usuario_id: int, quantidade: int) -> None:
+    """
+    Soma (ou subtrai, com quantidade negativa) refeicoes no contador do usuario.
+    Nao faz commit, o commit fica com quem chamou junto com a alteracao da refeicao
+    """
+    _insert_ou_atualizar(session, ContadorRefeicoesUsuario, {"usuario_id": usuario_id}, quantidade, somar=True)
+
+
+def definir_alimentos_refeicao(session: Session, refeicao_id: int, total: int) -> None:
+    """
+    Define o total de alimentos de uma refeicao ativa. Nao faz commit
+    """
+    chaves = {"refeicao_id": refeicao_id, "arquivada": False}
+    _insert_ou_atualizar(session, ContadorAlimentosRefeicao, chaves, total, somar=False)
+
+
+def remover_contadores_refeicao(session: Session, refeicao_id: int, arquivada: bool = False) -> None:
+    session.exec(delete(ContadorAlimentosRefeicao).where(
+        ContadorAlimentosRefeicao.refeicao_id == refeicao_id,
+        ContadorAlimentosRefeicao.arquivada == arquivada,
+    ))
+
+
+def remover_contadores_usuario(session: Session, usuario_id: int) -> None:
+    session.exec(delete(ContadorRefeicoesUsuario).where(ContadorRefeicoesUsuario.usuario_id == usuario_id))
+
+
+def reconstruir_contadores(session: Session) -> None:
+    """
+    Recalcula todos os contadores a partir das tabelas de refeicoes (ativas e arquivadas).
+    Usado apenas quando os contadores ainda nao existem, ex: banco criado antes deles
+    """
+    session.exec(delete(ContadorRefeicoesUsuario))
+    session.exec(delete(ContadorAlimentosRefeicao))
+
+    totais_usuario: dict[int, int] = {}
+    for modelo in (Refeicao, RefeicaoArquivada):
+        statement = select(modelo.usuario_id, func.count(modelo.id)).group_by(modelo.usuario_id)
+        for usuario_id, total in session.exec(statement).all():
+            totais_usuario[usuario_id] = totais_usuario.get(usuario_id, 0) + total
+    for usuario_id, total in totais_usuario.items():
+        session.add(ContadorRefeicoesUsuario(usuario_id=usuario_id, total=total))
+
+    for link, arquivada in ((RefeicaoAlimento, False), (RefeicaoAlimentoArquivada, True)):
+        statement = select(link.refeicao_id, func.count(link.alimento_id)).group_by(link.refeicao_id)
+        for refeicao_id, total in session.exec(statement).all():
+            session.add(ContadorAlimentosRefeicao(refeicao_id=refeicao_id, arquivada=arquivada, total=total))
+
+    session.commit()
+
+
+def sincronizar_contadores(session: Session) -> None:
+    """
+    Preenche os contadores se eles estiverem vazios mas ja existirem refeicoes no banco
+    """
+    possui_contadores = session.exec(select(ContadorRefeicoesUsuario.usuario_id).limit(1)).first()
+    possui_refeicoes = (
+        session.exec(select(Refeicao.id).limit(1)).first()
+        or session.exec(select(RefeicaoArquivada.id).limit(1)).first()
+    )
+    if possui_refeicoes and possui_contadores is None:
+        reconstruir_contadores(session)
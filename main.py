@@ -1,12 +1,18 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from database import create_db_and_tables
+from database import create_db_and_tables, get_session, engine
+from arquivamento import arquivar_refeicoes, migrar_ids_refeicao
+from contadores import sincronizar_contadores
 from rotas import home, usuarios, refeicoes, alimentos
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    migrar_ids_refeicao(engine)
+    with get_session() as session:
+        sincronizar_contadores(session)
+        arquivar_refeicoes(session)
 
     yield
     
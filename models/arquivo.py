@@ -0,0 +1,26 @@
+from sqlmodel import SQLModel, Field, Relationship
+from typing import List, TYPE_CHECKING
+from datetime import date
+from .refeicao import RefeicaoBase
+
+
+if TYPE_CHECKING:
+    from .usuario import Usuario
+    from .alimento import Alimento
+
+class RefeicaoAlimentoArquivada(SQLModel, table=True):
+    refeicao_id: int = Field(foreign_key="refeicaoarquivada.id", primary_key=True)
+    alimento_id: int = Field(foreign_key="alimento.id", primary_key=True)
+
+
+class RefeicaoArquivada(RefeicaoBase, table=True):
+    # Mantem o mesmo id que a refeicao tinha na tabela refeicao
+    usuario_id: int = Field(foreign_key="usuario.id", index=True)
+    usuario: "Usuario" = Relationship()
+    alimentos: List["Alimento"] = Relationship(link_model=RefeicaoAlimentoArquivada)
+
+
+class EstadoArquivamento(SQLModel, table=True):
+    # Refeicoes com data anterior a data_corte ja foram movidas para o arquivo
+    id: int | None = Field(default=None, primary_key=True)
+    data_corte: date
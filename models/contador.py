@@ -0,0 +1,13 @@
+from sqlmodel import SQLModel, Field
+
+
+class ContadorRefeicoesUsuario(SQLModel, table=True):
+    usuario_id: int = Field(primary_key=True)
+    total: int = 0
+
+
+class ContadorAlimentosRefeicao(SQLModel, table=True):
+    refeicao_id: int = Field(primary_key=True)
+    # Separa os contadores de refeicoes ativas e arquivadas
+    arquivada: bool = Field(default=False, primary_key=True)
+    total: int = 0
@@ -14,11 +14,14 @@ class RefeicaoAlimento(SQLModel, table=True):
 class RefeicaoBase(SQLModel):
     id: int | None = Field(default=None, primary_key=True)
     tipo: str  # Exemplo: cafe da manha, almoço, etc
-    data: date
+    data: date = Field(index=True)
 
 
 class Refeicao(RefeicaoBase, table=True):
-    usuario_id: int = Field(foreign_key="usuario.id")
+    # Evita que o sqlite reutilize ids de refeicoes ja movidas para o arquivo
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    usuario_id: int = Field(foreign_key="usuario.id", index=True)
     usuario: "Usuario" = Relationship(back_populates="refeicoes")
     alimentos: List["Alimento"] = Relationship(link_model=RefeicaoAlimento)
 
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, status
-from sqlmodel import Session, select, func
+from sqlmodel import Session, select
 from models.refeicao import Refeicao, RefeicaoAlimento, RefeicaoCreate, RefeicaoUpdate
+from models.arquivo import RefeicaoArquivada
 from database import get_session
+from arquivamento import buscar_refeicao, particoes_por_periodo, arquivar_refeicoes
+from contadores import total_alimentos_refeicao, somar_refeicoes_usuario, definir_alimentos_refeicao, remover_contadores_refeicao
 from datetime import date
 from models.alimento import Alimento
 from models.usuario import Usuario
-from sqlalchemy.orm import joinedload
 
 router = APIRouter(
     prefix="/refeicoes",
@@ -29,26 +31,29 @@ def create_refeicao(*, session: Session = Depends(get_session), refeicao: Refeic
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
+    # Valida os alimentos antes de gravar para a refeicao e os contadores irem no mesmo commit
+    for alimento_id in refeicao.alimentos_ids:
+        if not session.get(Alimento, alimento_id):
+            raise HTTPException(status_code=404, detail=f"Alimento com ID {alimento_id} não encontrado")
+
     nova_refeicao = Refeicao(
         tipo=refeicao.tipo,
         data=refeicao.data,
         usuario_id=refeicao.usuario_id
     )
     session.add(nova_refeicao)
-    session.commit()
-    session.refresh(nova_refeicao)
+    session.flush()
 
     for alimento_id in refeicao.alimentos_ids:
-        alimento = session.get(Alimento, alimento_id)
-        if not alimento:
-            raise HTTPException(status_code=404, detail=f"Alimento com ID {alimento_id} não encontrado")
-
         refeicao_alimento = RefeicaoAlimento(
             refeicao_id=nova_refeicao.id,
-            alimento_id=alimento.id
+            alimento_id=alimento_id
         )
         session.add(refeicao_alimento)
 
+    somar_refeicoes_usuario(session, nova_refeicao.usuario_id, 1)
+    definir_alimentos_refeicao(session, nova_refeicao.id, len(refeicao.alimentos_ids))
+
     session.commit()
     session.refresh(nova_refeicao)
 
@@ -81,7 +86,7 @@ def read_refeicoes(
 @router.get("/{refeicao_id}", response_model=Refeicao)
 def read_refeicao(refeicao_id: int, session: Session = Depends(get_session)):
     """
-    Lista uma refeicao pelo id dela
+    Lista uma refeicao pelo id dela, procurando tambem nas refeicoes arquivadas
     Args:
         refeicao_id (int): Id da refeicao
         session (Session): A sessao do banco de dados
@@ -91,7 +96,7 @@ def read_refeicao(refeicao_id: int, session: Session = Depends(get_session)):
     Raises:
         HTTPException: Caso a refeicao nao seja encontrada
     """ 
-    refeicao = session.get(Refeicao, refeicao_id)
+    refeicao = buscar_refeicao(session, refeicao_id)
     if not refeicao:
         raise HTTPException(status_code=404, detail="Refeicao não encontrada")
     return refeicao
@@ -100,7 +105,8 @@ def read_refeicao(refeicao_id: int, session: Session = Depends(get_session)):
 @router.get("/by_date/", response_model=list[Refeicao])
 def read_refeicoes_por_data(data: date, session: Session = Depends(get_session)):
     """
-    Retorna uma lista de refeicao ordernada pela data
+    Retorna uma lista de refeicao ordernada pela data.
+    Datas antigas tambem sao buscadas nas refeicoes arquivadas
     Args:
         data (date): Data da refeicao
         session (Session): A sessao do banco de dados
@@ -108,8 +114,11 @@ def read_refeicoes_por_data(data: date, session: Session = Depends(get_session))
     Returns:
         list[Refeicao]: Retorna uma lista de refeicoes
     """ 
-    statement = select(Refeicao).where(Refeicao.data == data)
-    return session.exec(statement).all()
+    refeicoes = []
+    for modelo in particoes_por_periodo(session, data):
+        statement = select(modelo).where(modelo.data == data)
+        refeicoes.extend(session.exec(statement).all())
+    return refeicoes
 
 
 @router.get("/refeicoes/{refeicao_id}/alimentos/count")
@@ -123,7 +132,8 @@ def count_alimentos_por_refeicao(refeicao_id: int, session: Session = Depends(ge
     Returns:
         objeto: Retorna o total de alimentos
     """ 
-    count = session.exec(select(func.count(RefeicaoAlimento.alimento_id)).where(RefeicaoAlimento.refeicao_id == refeicao_id)).one()
+    arquivada = session.get(Refeicao, refeicao_id) is None
+    count = total_alimentos_refeicao(session, refeicao_id, arquivada)
     return {"total_alimentos": count}
 
 @router.put("/{refeicao_id}", response_model=Refeicao)
@@ -143,27 +153,32 @@ def update_refeicao(*, session: Session = Depends(get_session), refeicao_id: int
         HTTPException: 
             - Se a refeicao nao for encontrada
             - Se algum dos alimentos nao forem encontrados
+            - Se a refeicao ja estiver arquivada
     """
     db_refeicao = session.get(Refeicao, refeicao_id)
     if not db_refeicao:
+        if session.get(RefeicaoArquivada, refeicao_id):
+            raise HTTPException(status_code=409, detail="Refeição arquivada não pode ser alterada")
         raise HTTPException(status_code=404, detail="Refeição não encontrada")
 
+    for alimento_id in refeicao.alimentos_ids:
+        if not session.get(Alimento, alimento_id):
+            raise HTTPException(status_code=404, detail=f"Alimento com ID {alimento_id} não encontrado")
+
     db_refeicao.tipo = refeicao.tipo
     db_refeicao.data = refeicao.data
 
     session.query(RefeicaoAlimento).filter_by(refeicao_id=refeicao_id).delete()
 
     for alimento_id in refeicao.alimentos_ids:
-        alimento = session.get(Alimento, alimento_id)
-        if not alimento:
-            raise HTTPException(status_code=404, detail=f"Alimento com ID {alimento_id} não encontrado")
-
         refeicao_alimento = RefeicaoAlimento(
             refeicao_id=db_refeicao.id,
-            alimento_id=alimento.id
+            alimento_id=alimento_id
         )
         session.add(refeicao_alimento)
 
+    definir_alimentos_refeicao(session, db_refeicao.id, len(refeicao.alimentos_ids))
+
     session.commit()
     session.refresh(db_refeicao)
 
@@ -174,7 +189,7 @@ def update_refeicao(*, session: Session = Depends(get_session), refeicao_id: int
 @router.delete("/{refeicao_id}")
 def delete_refeicao(refeicao_id: int, session: Session = Depends(get_session)):
     """
-    Apaga uma refeicao pelo id dela
+    Apaga uma refeicao pelo id dela, ativa ou arquivada
     Args:
         refeicao_id (int): Id da refeicao
         session (Session): A sessao do banco de dados
@@ -184,9 +199,11 @@ def delete_refeicao(refeicao_id: int, session: Session = Depends(get_session)):
     Raises:
         HTTPException: Caso a refeicao nao seja encontrada
     """ 
-    refeicao = session.get(Refeicao, refeicao_id)
+    refeicao = buscar_refeicao(session, refeicao_id)
     if not refeicao:
         raise HTTPException(status_code=404, detail="Refeicao não encontrada")
+    somar_refeicoes_usuario(session, refeicao.usuario_id, -1)
+    remover_contadores_refeicao(session, refeicao_id, isinstance(refeicao, RefeicaoArquivada))
     session.delete(refeicao)
     session.commit()
     return {"refeicao apagada": True}
@@ -205,9 +222,7 @@ def read_alimentos_por_refeicao(refeicao_id: int, session: Session = Depends(get
     Raises:
         HTTPException: Caso a refeicao nao seja encontrada
     """ 
-    refeicao = session.exec(
-        select(Refeicao).options(joinedload(Refeicao.alimentos)).where(Refeicao.id == refeicao_id)
-    ).unique().one_or_none()  # Use unique() e one_or_none()
+    refeicao = buscar_refeicao(session, refeicao_id, carregar="alimentos")
     
     if not refeicao:
         raise HTTPException(status_code=404, detail="Refeição não encontrada")
@@ -229,11 +244,23 @@ def read_usuario_por_refeicao(refeicao_id: int, session: Session = Depends(get_s
     Raises:
         HTTPException: Caso a refeicao nao seja encontrada
     """ 
-    refeicao = session.exec(
-        select(Refeicao).options(joinedload(Refeicao.usuario)).where(Refeicao.id == refeicao_id)
-    ).unique().one_or_none()  # Use unique() e one_or_none()
+    refeicao = buscar_refeicao(session, refeicao_id, carregar="usuario")
 
     if not refeicao:
         raise HTTPException(status_code=404, detail="Refeição não encontrada")
 
     return refeicao.usuario
+
+
+@router.post("/arquivar")
+def arquivar(session: Session = Depends(get_session)):
+    """
+    Move as refeicoes mais antigas que o horizonte configurado para o arquivo
+    Args:
+        session (Session): A sessao do banco de dados
+
+    Returns:
+        objeto: Retorna o total de refeicoes arquivadas
+    """ 
+    total = arquivar_refeicoes(session)
+    return {"refeicoes arquivadas": total}
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select, func
+from sqlalchemy.orm import joinedload
 from database import get_session
+from datetime import date
 from models.usuario import Usuario
-from models.refeicao import Refeicao
-from models.alimento import Alimento
-from models.refeicao import RefeicaoAlimento
+from arquivamento import particoes_por_periodo
+from contadores import total_refeicoes_usuario, remover_contadores_usuario
 
 
 router = APIRouter(
@@ -87,7 +88,7 @@ def count_refeicoes_por_usuario(usuario_id: int, session: Session = Depends(get_
     Returns:
         Objeto: Retorna um objeto com o numero de refeicoes
     """ 
-    count = session.exec(select(func.count(Refeicao.id)).where(Refeicao.usuario_id == usuario_id)).one()
+    count = total_refeicoes_usuario(session, usuario_id)
     return {"total_refeicoes": count}
 
 
@@ -141,22 +142,35 @@ def delete_user(usuario_id: int, session: Session = Depends(get_session)):
     Returns:
         Objeto: Retorna um objeto com uma mensagem de sucesso
     Raises:
-        HTTPException: Caso o usuario nao seja encontrado
+        HTTPException: 
+            - Caso o usuario nao seja encontrado
+            - Caso o usuario ainda tenha refeicoes, ativas ou arquivadas
     """ 
     usuario = session.get(Usuario, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario não encontrado")
+    if total_refeicoes_usuario(session, usuario_id) > 0:
+        raise HTTPException(status_code=409, detail="Usuario possui refeições, apague-as antes")
+    remover_contadores_usuario(session, usuario_id)
     session.delete(usuario)
     session.commit()
     return {"Usuario deletado": True}
 
 @router.get("/{usuario_id}/refeicoes_com_alimentos")
-def read_refeicoes_com_alimentos(usuario_id: int, session: Session = Depends(get_session)):
+def read_refeicoes_com_alimentos(
+    usuario_id: int,
+    inicio: date | None = None,
+    fim: date | None = None,
+    session: Session = Depends(get_session)
+):
     """
-    Retorna as refeicoes com alimentos de um usuario
+    Retorna as refeicoes com alimentos de um usuario, incluindo as arquivadas
+    quando o periodo pedido alcanca datas antigas
 
     Args:
         usuario_id (int): Id do usuario
+        inicio (date): Data inicial do periodo (opcional)
+        fim (date): Data final do periodo (opcional)
         session (Session): sessao do banco de dados
     Raises:
         HTTPException: Caso o alimento ou uma refeicao nao seja encontrada
@@ -164,19 +178,23 @@ def read_refeicoes_com_alimentos(usuario_id: int, session: Session = Depends(get
     Returns:
         resultado: objeto contendo os refeicoes e alimentos
     """ 
-    usuario = session.exec(
-        select(Usuario).options(joinedload(Usuario.refeicoes).joinedload(Refeicao.alimentos)).where(Usuario.id == usuario_id)
-    ).unique().one_or_none()  # Use unique() e one_or_none()
-    
+    usuario = session.get(Usuario, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
     resultado = []
-    for refeicao in usuario.refeicoes:
-        resultado.append({
-            "refeicao": refeicao,
-            "alimentos": refeicao.alimentos
-        })
+    for modelo in particoes_por_periodo(session, inicio):
+        statement = select(modelo).options(joinedload(modelo.alimentos)).where(modelo.usuario_id == usuario_id)
+        if inicio:
+            statement = statement.where(modelo.data >= inicio)
+        if fim:
+            statement = statement.where(modelo.data <= fim)
+
+        for refeicao in session.exec(statement).unique().all():
+            resultado.append({
+                "refeicao": refeicao,
+                "alimentos": refeicao.alimentos
+            })
 
     return resultado
 
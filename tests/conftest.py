@@ -0,0 +1,22 @@
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+# O engine e criado na importacao de database.py, entao o banco de teste
+# (uma copia do database.db versionado) precisa ser definido antes
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BANCO_TESTE = os.path.join(tempfile.mkdtemp(), "database.db")
+shutil.copy(os.path.join(RAIZ, "database.db"), BANCO_TESTE)
+os.environ["DATABASE_URL"] = f"sqlite:///{BANCO_TESTE}"
+sys.path.insert(0, RAIZ)
+
+from fastapi.testclient import TestClient
+from main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+
+def criar_refeicao(client, data, usuario_id=1, alimentos_ids=(1,)):
+    response = client.post("/refeicoes/", json={
+        "tipo": "almoço",
+        "data": data,
+        "usuario_id": usuario_id,
+        "alimentos_ids": list(alimentos_ids),
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_inicializacao_arquiva_refeicoes_antigas(client):
+    # Todas as refeicoes do banco versionado sao mais antigas que o horizonte padrao
+    assert client.get("/refeicoes/").json() == []
+    assert client.get("/refeicoes/1").json()["data"] == "2023-01-01"
+    assert client.get("/refeicoes/by_date/", params={"data": "2023-01-01"}).json()[0]["id"] == 1
+    assert client.get("/refeicoes/refeicoes/1/alimentos/count").json() == {"total_alimentos": 2}
+    assert client.get("/usuarios/10/refeicoes/contar").json() == {"total_refeicoes": 2}
+
+
+def test_criar_e_arquivar_novamente_nao_reutiliza_ids(client):
+    antes = client.get("/usuarios/1/refeicoes/contar").json()["total_refeicoes"]
+
+    recente = criar_refeicao(client, date.today().isoformat(), alimentos_ids=())
+    antiga = criar_refeicao(client, "2020-01-01", alimentos_ids=(1, 2, 3))
+    assert recente["id"] > 11 and antiga["id"] > 11
+
+    # A refeicao arquivada com id 1 continua acessivel e com seu proprio contador
+    assert client.get("/refeicoes/1").json()["data"] == "2023-01-01"
+    assert client.get("/refeicoes/refeicoes/1/alimentos/count").json() == {"total_alimentos": 2}
+    assert client.get(f"/refeicoes/refeicoes/{recente['id']}/alimentos/count").json() == {"total_alimentos": 0}
+
+    # Criada com data antiga depois do arquivamento, ainda esta na tabela ativa
+    por_data = client.get("/refeicoes/by_date/", params={"data": "2020-01-01"}).json()
+    assert [refeicao["id"] for refeicao in por_data] == [antiga["id"]]
+
+    assert client.post("/refeicoes/arquivar").json() == {"refeicoes arquivadas": 1}
+
+    por_data = client.get("/refeicoes/by_date/", params={"data": "2020-01-01"}).json()
+    assert [refeicao["id"] for refeicao in por_data] == [antiga["id"]]
+    assert client.get(f"/refeicoes/{antiga['id']}/alimentos").status_code == 200
+    assert client.get(f"/refeicoes/refeicoes/{antiga['id']}/alimentos/count").json() == {"total_alimentos": 3}
+    assert client.put(f"/refeicoes/{antiga['id']}", json={
+        "tipo": "jantar", "data": "2020-01-01", "alimentos_ids": [],
+    }).status_code == 409
+    assert client.get("/usuarios/1/refeicoes/contar").json() == {"total_refeicoes": antes + 2}
+
+    novo = criar_refeicao(client, date.today().isoformat())
+    assert novo["id"] > antiga["id"]
+
+
+def test_historico_do_usuario_por_periodo(client):
+    criar_refeicao(client, date.today().isoformat(), usuario_id=2)
+
+    historico = client.get("/usuarios/2/refeicoes_com_alimentos").json()
+    assert sorted(item["refeicao"]["data"] for item in historico) == ["2023-01-02", date.today().isoformat()]
+
+    inicio = (date.today() - timedelta(days=7)).isoformat()
+    recentes = client.get("/usuarios/2/refeicoes_com_alimentos", params={"inicio": inicio}).json()
+    assert [item["refeicao"]["data"] for item in recentes] == [date.today().isoformat()]
+
+
+def test_alimento_invalido_nao_cria_refeicao(client):
+    antes = client.get("/usuarios/3/refeicoes/contar").json()["total_refeicoes"]
+
+    response = client.post("/refeicoes/", json={
+        "tipo": "almoço", "data": date.today().isoformat(), "usuario_id": 3, "alimentos_ids": [1, 9999],
+    })
+    assert response.status_code == 404
+
+    historico = client.get("/usuarios/3/refeicoes_com_alimentos").json()
+    assert client.get("/usuarios/3/refeicoes/contar").json() == {"total_refeicoes": antes}
+    assert len(historico) == antes
+
+
+def test_apagar_refeicao_atualiza_contadores(client):
+    refeicao = criar_refeicao(client, date.today().isoformat(), usuario_id=4, alimentos_ids=(1, 2))
+    assert client.get("/usuarios/4/refeicoes/contar").json() == {"total_refeicoes": 2}
+
+    assert client.delete(f"/refeicoes/{refeicao['id']}").status_code == 200
+    assert client.delete("/refeicoes/4").status_code == 200  # arquivada
+    assert client.get("/usuarios/4/refeicoes/contar").json() == {"total_refeicoes": 0}
+    assert client.get(f"/refeicoes/refeicoes/{refeicao['id']}/alimentos/count").json() == {"total_alimentos": 0}
+
+
+def test_apagar_usuario_com_refeicoes_arquivadas(client):
+    response = client.delete("/usuarios/5")
+    assert response.status_code == 409
+    assert client.get("/usuarios/5/refeicoes/contar").json() == {"total_refeicoes": 1}